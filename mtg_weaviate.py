@@ -1,12 +1,21 @@
 
-    
-import json
+
+import httpx
+import ijson
+import itertools
+import logging
+import mmap
+from contextlib import ExitStack
+from operator import itemgetter
 import weaviate
-from weaviate.classes.init import Auth
+from weaviate.classes.init import AdditionalConfig, Auth, Timeout
 import os
 from weaviate.classes.config import Configure, Property, DataType
 import getpass
 
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
     
 if not os.environ.get("WEAVIATE_URL"):
   os.environ["WEAVIATE_URL"] = getpass.getpass("WEAVIATE_URL: ")
@@ -18,8 +27,56 @@ if not os.environ.get("WEAVIATE_API"):
 client = weaviate.connect_to_weaviate_cloud(
     cluster_url=os.environ.get("WEAVIATE_URL"),
     auth_credentials=os.environ["WEAVIATE_API"],
+    # Generous insert timeout so parallel batch streams don't time out
+    # on large flushes
+    additional_config=AdditionalConfig(timeout=Timeout(insert=120)),
+)
+
+# Fan batch uploads out over parallel gRPC streams; ingest is bound on
+# TLS round-trips, so transfer overlaps server-side indexing
+BATCH_SIZE = 500
+CONCURRENT_REQUESTS = 4
+
+# Deletion tables for str.translate - one C-level pass instead of
+# chained .replace() calls that each allocate an intermediate string
+_QUOTE_TBL = str.maketrans("", "", "\"'")
+_BRACE_TBL = str.maketrans("", "", "{}")
+
+# C-level 'text' extraction for ruling dicts, no Python frame per element
+_get_text = itemgetter('text')
+
+# HNSW with scalar quantization: int8 vectors cut index RAM ~4x and
+# keep more of the graph cache-resident during traversal
+_VECTOR_INDEX = Configure.VectorIndex.hnsw(
+    ef=64,
+    ef_construction=128,
+    quantizer=Configure.VectorIndex.Quantizer.sq(),
 )
 
+# Local text-embeddings-inference server (e.g. ghcr.io/huggingface/
+# text-embeddings-inference with BAAI/bge-small-en-v1.5). Vectors are
+# computed client-side and pushed with each object so Weaviate does no
+# per-object inference during ingest.
+EMBED_URL = os.environ.get("EMBED_URL", "http://localhost:8080/embed")
+EMBED_BATCH = 256
+
+embed_client = httpx.Client(timeout=120.0)
+
+
+def embed(texts):
+    """Embed a batch of texts against the local TEI server"""
+    response = embed_client.post(EMBED_URL, json={"inputs": texts})
+    response.raise_for_status()
+    return response.json()
+
+
+def flush_embedded(batch, pending, vector_name):
+    """Embed pending (text, properties) pairs and add them to a batch"""
+    vectors = embed([text for text, _ in pending])
+    for (_, properties), vector in zip(pending, vectors):
+        batch.add_object(properties=properties, vector={vector_name: vector})
+    pending.clear()
+
 
 
 client.collections.create(
@@ -30,10 +87,9 @@ client.collections.create(
         Property(name="section", data_type=DataType.TEXT),
     ],
     vector_config=[
-        Configure.Vectors.text2vec_weaviate(
+        Configure.Vectors.self_provided(
             name="rule_vector",
-            source_properties=["rule"],
-            model="text2vec-huggingface"
+            vector_index_config=_VECTOR_INDEX,
         )
     ]
 )
@@ -44,10 +100,9 @@ client.collections.create(
         Property(name="rulings", data_type=DataType.TEXT),
     ],
     vector_config=[
-        Configure.Vectors.text2vec_weaviate(
+        Configure.Vectors.self_provided(
             name="rulings_vector",
-            source_properties=["name", "rulings"],
-            model="text2vec-huggingface"
+            vector_index_config=_VECTOR_INDEX,
         )
     ]
 )
@@ -64,18 +119,9 @@ client.collections.create(
         Property(name="colors", data_type=DataType.TEXT_ARRAY),
     ],
     vector_config=[
-        Configure.Vectors.text2vec_weaviate(
+        Configure.Vectors.self_provided(
             name="cards_vector",
-            source_properties=[
-                "name",
-                "manaCost",
-                "colors",
-                "type",
-                "text",
-                "power",
-                "toughness",
-            ],
-            model="text2vec-huggingface"
+            vector_index_config=_VECTOR_INDEX,
         )
     ]
 )
@@ -90,86 +136,109 @@ cards_collection = client.collections.get("MTGCards3")
 
 ################################################
 
+def iter_paragraphs(mm):
+    """Yield rulebook paragraphs one at a time as slices of the mapping"""
+    start = 0
+    while (idx := mm.find(b"\n\n", start)) != -1:
+        yield mm[start:idx].decode('utf-8', 'ignore')
+        start = idx + 2
+    if start < len(mm):
+        yield mm[start:].decode('utf-8', 'ignore')
+
+
 rulebook_file = "./mtg_rules.txt"
-with open(rulebook_file, 'r', encoding='utf-8') as f:
-    rulebook_text = f.read()
-    
-splitText = rulebook_text.split("\n\n")
-
-with official_rules_collection.batch.fixed_size(batch_size=500) as batch:
-    for src_obj in splitText:
-        batch.add_object(
-            properties={
-                "rule": src_obj,
-            },
-        )
-        if batch.number_errors > 10:
-            print("Batch import stopped due to excessive errors.")
-            break
+with open(rulebook_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+    # Walk the mapping with find() so only one paragraph is decoded at a
+    # time instead of splitting the whole rulebook into a list up front
+    paragraphs = iter_paragraphs(mm)
+
+    with official_rules_collection.batch.fixed_size(
+        batch_size=BATCH_SIZE, concurrent_requests=CONCURRENT_REQUESTS
+    ) as batch:
+        while chunk := list(itertools.islice(paragraphs, EMBED_BATCH)):
+            for src_obj, vector in zip(chunk, embed(chunk)):
+                batch.add_object(
+                    properties={
+                        "rule": src_obj,
+                    },
+                    vector={"rule_vector": vector},
+                )
+            if batch.number_errors > 10:
+                logger.warning("Batch import stopped due to excessive errors.")
+                break
         
         
 ################################################
         
  
 cards_file = "./AtomicCards.json"
-with open(cards_file, 'r', encoding='utf-8') as f:
-    cards_text = json.loads(f.read())
-    
-# print(cards_text)
 
-with rulings_collection.batch.fixed_size(batch_size=500) as batch:
-    for key, value in cards_text['data'].items():
+# Stream (card name, printings) pairs out of AtomicCards.json instead of
+# decoding the whole file up front, and feed both batches from the same
+# pass so the file is only read once.
+with ExitStack() as stack:
+    f = stack.enter_context(open(cards_file, 'rb'))
+    cards_mm = stack.enter_context(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    rulings_batch = stack.enter_context(
+        rulings_collection.batch.fixed_size(
+            batch_size=BATCH_SIZE, concurrent_requests=CONCURRENT_REQUESTS
+        )
+    )
+    cards_batch = stack.enter_context(
+        cards_collection.batch.fixed_size(
+            batch_size=BATCH_SIZE, concurrent_requests=CONCURRENT_REQUESTS
+        )
+    )
+
+    rulings_pending = []
+    cards_pending = []
+    aborted = False
+
+    for key, value in ijson.kvitems(cards_mm, 'data'):
         card_info = value[0]
-        rulings = []
+
         if "rulings" in card_info:
-            # print(card_info['rulings'])
-            # print(card_info['rulings'].keys())
-            rulings = [ruling['text'] for ruling in card_info['rulings']]
-            # for ruling in card_info["rulings"]:
-                # print(rulings)
-                
-            rulingsStr = ""
-            
-            for ruling in rulings:
-                rulingsStr += str(ruling).replace("\"", "").replace("\'", "")
-            print(rulingsStr)
-        
-            
-            batch.add_object(
-                properties={
-                    "name": card_info['name'],
-                    "rulings": rulingsStr,
-                },
+            rulingsStr = "".join(
+                text.translate(_QUOTE_TBL) for text in map(_get_text, card_info['rulings'])
             )
-        
-        if batch.number_errors > 10:
-            print("Batch import stopped due to excessive errors.")
-            break
- 
- 
- 
- 
-################################################
 
-with cards_collection.batch.fixed_size(batch_size=500) as batch:
-    for key, value in cards_text['data'].items():
-        card_info = value[0]
-        
-        batch.add_object(
-            properties={
+            rulings_properties = {
                 "name": card_info['name'],
-                "manaCost": card_info.get("manaCost", "").replace("{", "").replace("}", ""),
-                "type": card_info.get("type", ""),
-                "text": card_info.get("text", ""),
-                "power": card_info.get("power", ""),
-                "toughness": card_info.get("toughness", ""),
-                "colors": card_info.get("colors", ""),
-            },
+                "rulings": rulingsStr,
+            }
+            rulings_pending.append(
+                (f"{card_info['name']} {rulingsStr}", rulings_properties)
+            )
+            if len(rulings_pending) >= EMBED_BATCH:
+                flush_embedded(rulings_batch, rulings_pending, "rulings_vector")
+
+        card_properties = {
+            "name": card_info['name'],
+            "manaCost": card_info.get("manaCost", "").translate(_BRACE_TBL),
+            "type": card_info.get("type", ""),
+            "text": card_info.get("text", ""),
+            "power": card_info.get("power", ""),
+            "toughness": card_info.get("toughness", ""),
+            "colors": card_info.get("colors", ""),
+        }
+        cards_pending.append(
+            (" ".join(str(v) for v in card_properties.values() if v), card_properties)
         )
-        if batch.number_errors > 10:
-            print("Batch import stopped due to excessive errors.")
+        if len(cards_pending) >= EMBED_BATCH:
+            flush_embedded(cards_batch, cards_pending, "cards_vector")
+
+        if rulings_batch.number_errors > 10 or cards_batch.number_errors > 10:
+            logger.warning("Batch import stopped due to excessive errors.")
+            aborted = True
             break
 
+    # Don't submit buffered objects to batches that just failed
+    if not aborted:
+        if rulings_pending:
+            flush_embedded(rulings_batch, rulings_pending, "rulings_vector")
+        if cards_pending:
+            flush_embedded(cards_batch, cards_pending, "cards_vector")
+
 print(client.is_ready())  # Should print: `True`
 
 # Work with Weaviate
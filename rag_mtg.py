@@ -5,11 +5,13 @@ from langchain_core.documents import Document
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langgraph.graph import START, StateGraph
 from typing_extensions import List, TypedDict
-from langchain_core.vectorstores import InMemoryVectorStore
-from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+from langchain_huggingface import HuggingFaceEmbeddings
 
 from langchain.chat_models import init_chat_model
 import getpass
+import itertools
+import mmap
 import os
 
 
@@ -18,26 +20,33 @@ if not os.environ.get("ANTHROPIC_API_KEY"):
 
 llm = init_chat_model("claude-3-5-sonnet-latest", model_provider="anthropic")
 
-embeddings = DeterministicFakeEmbedding(size=4096)
+embeddings = HuggingFaceEmbeddings(model_name="BAAI/bge-small-en-v1.5")
 
-vector_store = InMemoryVectorStore(embeddings)
+vector_store = None
 
 file_path = "./mtg_rules.txt" 
 
-with open(file_path, 'r') as file:
-    # Read the entire content of the file
-    content = file.read()
-    print("File content:")
-    print(content)
-    
-    
-text_splitter = RecursiveCharacterTextSplitter(chunk_size=100, chunk_overlap=20)
-all_splits = text_splitter.split_text(content)
+with open(file_path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+    # Map the file instead of read() so pages are faulted in on demand
+    # and shared through the page cache across reruns
+    content = bytes(mm).decode('utf-8')
 
-print(f"Split blog post into {len(all_splits)} sub-documents.")
 
-# Index chunks
-_ = vector_store.add_texts(texts=all_splits)
+
+text_splitter = RecursiveCharacterTextSplitter(chunk_size=512, chunk_overlap=20)
+
+# split_text returns the full list of chunks; index it in batches of
+# 1024 so each FAISS/embedding call stays a bounded size
+splits = iter(text_splitter.split_text(content))
+indexed = 0
+while batch := list(itertools.islice(splits, 1024)):
+    if vector_store is None:
+        vector_store = FAISS.from_texts(batch, embeddings)
+    else:
+        vector_store.add_texts(texts=batch)
+    indexed += len(batch)
+
+print(f"Split rulebook into {indexed} sub-documents.")
 
 # Define prompt for question-answering
 # N.B. for non-US LangSmith endpoints, you may need to specify
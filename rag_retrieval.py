@@ -1,7 +1,12 @@
 import weaviate
 import openai
+import asyncio
+import hashlib
 import logging
+import re
+import time
 from typing import Dict, List, Any, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 import json
 
@@ -9,6 +14,35 @@ import json
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Prompt scaffolding built once at import time rather than re-allocated
+# on every generate_answer call
+_SYSTEM_PROMPT = """You are an expert Magic: The Gathering judge with comprehensive knowledge of the game rules, cards, and official rulings.
+
+Your responsibilities:
+1. Provide accurate, rule-based answers using the official context provided
+2. Cite specific rules, cards, or rulings when relevant
+3. Explain complex interactions clearly and step-by-step
+4. If the provided context doesn't fully answer the question, clearly state what information is missing
+5. Always prioritize official rules over card text when there are conflicts
+6. Use proper MTG terminology
+
+Answer format guidelines:
+- Start with a direct answer to the question
+- Provide detailed explanation with rule citations
+- Include relevant card interactions if applicable
+- End with any important caveats or edge cases"""
+
+_USER_TMPL = """Based on the following official Magic: The Gathering information, please answer this question:
+
+QUESTION: {question}
+
+OFFICIAL CONTEXT:
+{context}
+
+Please provide a comprehensive answer using the official information provided above."""
+
+_SYSTEM_MESSAGE = {"role": "system", "content": _SYSTEM_PROMPT}
+
 class MTGRAGPipeline:
     def __init__(self, weaviate_client, openai_api_key: str, model: str = "gpt-4"):
         """
@@ -21,14 +55,29 @@ class MTGRAGPipeline:
         """
         self.client = weaviate_client
         self.openai_client = openai.OpenAI(api_key=openai_api_key)
+        self.async_openai_client = openai.AsyncOpenAI(api_key=openai_api_key)
         self.model = model
         
         # Collection names
         self.collections = {
             "rules": "MTGOfficialRules",
-            "cards": "MTGCards", 
+            "cards": "MTGCards",
             "rulings": "MTGRulings"
         }
+
+        # Resolve collection handles once instead of on every search
+        self._collection_handles = {
+            name: weaviate_client.collections.get(collection)
+            for name, collection in self.collections.items()
+        }
+
+        # Caches so repeated questions skip the Weaviate round-trips and
+        # the LLM call entirely
+        self._search_cache: Dict[tuple, Dict[str, List[Any]]] = {}
+        self._search_cache_max = 1024
+        self._answer_cache: Dict[str, tuple] = {}
+        self._answer_cache_max = 512
+        self._answer_cache_ttl = 3600
     
     def search_all_collections(
         self, 
@@ -47,9 +96,23 @@ class MTGRAGPipeline:
         Returns:
             Dictionary with results from each collection
         """
+        # Normalize so partial dicts like {"rules": 5} fall back to the
+        # default limit instead of raising KeyError below
         if limits is None:
-            limits = {"rules": 3, "cards": 3, "rulings": 3}
-        
+            limits = {}
+        limits = {name: limits.get(name, 3) for name in ("rules", "cards", "rulings")}
+
+        cache_key = (
+            re.sub(r"\s+", " ", query_text.strip().lower()),
+            limits["rules"],
+            limits["cards"],
+            limits["rulings"],
+            min_score
+        )
+        if cache_key in self._search_cache:
+            logger.info(f"Search cache hit for: '{query_text}'")
+            return self._search_cache[cache_key]
+
         results = {
             "rules": [],
             "cards": [], 
@@ -63,73 +126,55 @@ class MTGRAGPipeline:
         }
         
         logger.info(f"Searching all collections for: '{query_text}'")
-        
-        # Search MTG Official Rules
-        try:
-            rules_collection = self.client.collections.get(self.collections["rules"])
-            rules_response = rules_collection.query.near_text(
-                query=query_text,
-                limit=limits["rules"],
-                return_metadata=["score", "distance"]
-            )
-            
-            # Filter by score
-            filtered_rules = [
-                obj for obj in rules_response.objects 
-                if obj.metadata.score >= min_score
-            ]
-            results["rules"] = filtered_rules
-            
-            logger.info(f"Found {len(filtered_rules)} relevant rules (from {len(rules_response.objects)} total)")
-            
-        except Exception as e:
-            logger.error(f"Error searching rules: {e}")
-            results["rules"] = []
-        
-        # Search MTG Cards
-        try:
-            cards_collection = self.client.collections.get(self.collections["cards"])
-            cards_response = cards_collection.query.near_text(
-                query=query_text,
-                limit=limits["cards"],
-                return_metadata=["score", "distance"]
-            )
-            
-            # Filter by score
-            filtered_cards = [
-                obj for obj in cards_response.objects 
-                if obj.metadata.score >= min_score
-            ]
-            results["cards"] = filtered_cards
-            
-            logger.info(f"Found {len(filtered_cards)} relevant cards (from {len(cards_response.objects)} total)")
-            
-        except Exception as e:
-            logger.error(f"Error searching cards: {e}")
-            results["cards"] = []
-        
-        # Search MTG Rulings
-        try:
-            rulings_collection = self.client.collections.get(self.collections["rulings"])
-            rulings_response = rulings_collection.query.near_text(
-                query=query_text,
-                limit=limits["rulings"],
-                return_metadata=["score", "distance"]
-            )
-            
-            # Filter by score
-            filtered_rulings = [
-                obj for obj in rulings_response.objects 
-                if obj.metadata.score >= min_score
-            ]
-            results["rulings"] = filtered_rulings
-            
-            logger.info(f"Found {len(filtered_rulings)} relevant rulings (from {len(rulings_response.objects)} total)")
-            
-        except Exception as e:
-            logger.error(f"Error searching rulings: {e}")
-            results["rulings"] = []
-        
+
+        def _search(name: str) -> Optional[List[Any]]:
+            """Query one collection and filter its results by score
+
+            Returns None (rather than an empty list) on failure so the
+            caller can tell an outage apart from no matches.
+            """
+            try:
+                response = self._collection_handles[name].query.near_text(
+                    query=query_text,
+                    limit=limits[name],
+                    return_metadata=["score", "distance"]
+                )
+
+                # Filter by score
+                filtered = [
+                    obj for obj in response.objects
+                    if obj.metadata.score >= min_score
+                ]
+
+                logger.info(f"Found {len(filtered)} relevant {name} (from {len(response.objects)} total)")
+                return filtered
+
+            except Exception as e:
+                logger.error(f"Error searching {name}: {e}")
+                return None
+
+        # Each query is a full network round-trip to Weaviate, so issue all
+        # three concurrently; wall time is bounded by the slowest one
+        search_failed = False
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = {
+                executor.submit(_search, name): name
+                for name in ("rules", "cards", "rulings")
+            }
+            for future in as_completed(futures):
+                filtered = future.result()
+                if filtered is None:
+                    search_failed = True
+                    filtered = []
+                results[futures[future]] = filtered
+
+        # Don't cache results from a failed search, or a transient outage
+        # would pin empty results for this query indefinitely
+        if not search_failed:
+            if len(self._search_cache) >= self._search_cache_max:
+                self._search_cache.pop(next(iter(self._search_cache)))
+            self._search_cache[cache_key] = results
+
         return results
     
     def format_context_for_llm(self, search_results: Dict[str, List[Any]]) -> str:
@@ -153,25 +198,28 @@ class MTGRAGPipeline:
         # Add rules context
         if search_results["rules"]:
             context_parts.append("=== OFFICIAL RULES ===")
-            for i, obj in enumerate(search_results["rules"], 1):
-                rule_text = obj.properties.get("rule", "")
-                score = getattr(obj.metadata, 'score', 0)
-                context_parts.append(f"{i}. [Score: {score:.3f}] {rule_text}")
+            context_parts.extend(
+                f"{i}. [Score: {format(getattr(obj.metadata, 'score', 0), '.3f')}] {obj.properties.get('rule', '')}"
+                for i, obj in enumerate(search_results["rules"], 1)
+            )
             context_parts.append("")
-        
-        # Add cards context  
+
+        # Add cards context
         if search_results["cards"]:
             context_parts.append("=== RELEVANT CARDS ===")
             for i, obj in enumerate(search_results["cards"], 1):
-                name = obj.properties.get("name", "Unknown Card")
-                text = obj.properties.get("text", "")
-                card_type = obj.properties.get("type", "")
-                manacost = obj.properties.get("manacost", "")
-                power = obj.properties.get("power", "")
-                toughness = obj.properties.get("toughness", "")
+                # Bind the properties dict once instead of six attribute
+                # chains per card
+                p = obj.properties
+                name = p.get("name", "Unknown Card")
+                text = p.get("text", "")
+                card_type = p.get("type", "")
+                manacost = p.get("manacost", "")
+                power = p.get("power", "")
+                toughness = p.get("toughness", "")
                 score = getattr(obj.metadata, 'score', 0)
-                
-                card_info = f"{i}. [Score: {score:.3f}] {name}"
+
+                card_info = f"{i}. [Score: {format(score, '.3f')}] {name}"
                 if manacost:
                     card_info += f" {manacost}"
                 if card_type:
@@ -188,13 +236,14 @@ class MTGRAGPipeline:
         if search_results["rulings"]:
             context_parts.append("=== OFFICIAL RULINGS ===")
             for i, obj in enumerate(search_results["rulings"], 1):
-                name = obj.properties.get("name", "Unknown Card")
-                ruling = obj.properties.get("rulings", "")
-                ruling_date = obj.properties.get("ruling_date", "")
-                source = obj.properties.get("source", "")
+                p = obj.properties
+                name = p.get("name", "Unknown Card")
+                ruling = p.get("rulings", "")
+                ruling_date = p.get("ruling_date", "")
+                source = p.get("source", "")
                 score = getattr(obj.metadata, 'score', 0)
-                
-                ruling_info = f"{i}. [Score: {score:.3f}] {name}"
+
+                ruling_info = f"{i}. [Score: {format(score, '.3f')}] {name}"
                 if ruling_date:
                     ruling_info += f" ({ruling_date})"
                 if source:
@@ -218,47 +267,111 @@ class MTGRAGPipeline:
         Returns:
             Generated answer
         """
-        system_prompt = """You are an expert Magic: The Gathering judge with comprehensive knowledge of the game rules, cards, and official rulings. 
+        return "".join(self.generate_answer_stream(question, context, temperature))
 
-Your responsibilities:
-1. Provide accurate, rule-based answers using the official context provided
-2. Cite specific rules, cards, or rulings when relevant
-3. Explain complex interactions clearly and step-by-step
-4. If the provided context doesn't fully answer the question, clearly state what information is missing
-5. Always prioritize official rules over card text when there are conflicts
-6. Use proper MTG terminology
+    def generate_answer_stream(self, question: str, context: str, temperature: float = 0.1):
+        """
+        Stream the answer as it is generated instead of blocking on the
+        full completion, so the first tokens are available in ~200ms
 
-Answer format guidelines:
-- Start with a direct answer to the question
-- Provide detailed explanation with rule citations
-- Include relevant card interactions if applicable
-- End with any important caveats or edge cases"""
+        Args:
+            question: User's question
+            context: Formatted context from search results
+            temperature: OpenAI temperature parameter
 
-        user_prompt = f"""Based on the following official Magic: The Gathering information, please answer this question:
+        Yields:
+            Answer text fragments as they arrive from OpenAI
+        """
+        cache_key = self._answer_cache_key(question, context, temperature)
+        cached = self._answer_cache_lookup(cache_key, question)
+        if cached is not None:
+            yield cached
+            return
 
-QUESTION: {question}
+        try:
+            stream = self.openai_client.chat.completions.create(
+                model=self.model,
+                messages=self._build_messages(question, context),
+                temperature=temperature,
+                max_tokens=1000,
+                stream=True
+            )
 
-OFFICIAL CONTEXT:
-{context}
+            parts = []
+            for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
 
-Please provide a comprehensive answer using the official information provided above."""
+            self._answer_cache_store(cache_key, "".join(parts))
+
+        except Exception as e:
+            logger.error(f"Error generating answer: {e}")
+            yield f"I encountered an error while generating the answer: {str(e)}"
+
+    async def generate_answer_async(self, question: str, context: str, temperature: float = 0.1) -> str:
+        """
+        Async variant of generate_answer using the async OpenAI client
+
+        Args:
+            question: User's question
+            context: Formatted context from search results
+            temperature: OpenAI temperature parameter
+
+        Returns:
+            Generated answer
+        """
+        cache_key = self._answer_cache_key(question, context, temperature)
+        cached = self._answer_cache_lookup(cache_key, question)
+        if cached is not None:
+            return cached
 
         try:
-            response = self.openai_client.chat.completions.create(
+            response = await self.async_openai_client.chat.completions.create(
                 model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
+                messages=self._build_messages(question, context),
                 temperature=temperature,
                 max_tokens=1000
             )
-            
-            return response.choices[0].message.content
-            
+
+            answer = response.choices[0].message.content
+            self._answer_cache_store(cache_key, answer)
+            return answer
+
         except Exception as e:
             logger.error(f"Error generating answer: {e}")
             return f"I encountered an error while generating the answer: {str(e)}"
+
+    def _build_messages(self, question: str, context: str) -> List[Dict[str, str]]:
+        """Build the chat messages for an answer-generation call"""
+        return [
+            _SYSTEM_MESSAGE,
+            {"role": "user", "content": _USER_TMPL.format(question=question, context=context)}
+        ]
+
+    def _answer_cache_key(self, question: str, context: str, temperature: float) -> str:
+        """Hash the inputs that determine an answer into a cache key"""
+        return hashlib.blake2b(
+            f"{question}|{context}|{temperature}".encode(), digest_size=16
+        ).hexdigest()
+
+    def _answer_cache_lookup(self, cache_key: str, question: str) -> Optional[str]:
+        """Return a cached answer if present and not expired"""
+        cached = self._answer_cache.get(cache_key)
+        if cached is not None:
+            cached_at, answer = cached
+            if time.time() - cached_at < self._answer_cache_ttl:
+                logger.info(f"Answer cache hit for: '{question}'")
+                return answer
+            del self._answer_cache[cache_key]
+        return None
+
+    def _answer_cache_store(self, cache_key: str, answer: str) -> None:
+        """Store an answer in the cache, evicting the oldest entry if full"""
+        if len(self._answer_cache) >= self._answer_cache_max:
+            self._answer_cache.pop(next(iter(self._answer_cache)))
+        self._answer_cache[cache_key] = (time.time(), answer)
     
     def answer_question(
         self, 
@@ -282,17 +395,71 @@ Please provide a comprehensive answer using the official information provided ab
             Dictionary containing answer and metadata
         """
         logger.info(f"Processing question: '{question}'")
-        
+
         # Step 1: Search all collections
         search_results = self.search_all_collections(question, limits, min_score)
-        
+
         # Step 2: Format context
         context = self.format_context_for_llm(search_results)
-        
+
         # Step 3: Generate answer
         answer = self.generate_answer(question, context, temperature)
-        
+
         # Step 4: Prepare response
+        return self._build_result(
+            question, answer, search_results, context,
+            limits, min_score, temperature, include_debug
+        )
+
+    async def answer_question_async(
+        self,
+        question: str,
+        limits: Dict[str, int] = None,
+        min_score: float = 0.7,
+        temperature: float = 0.1,
+        include_debug: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Async variant of answer_question for concurrent processing
+
+        The Weaviate search runs in a worker thread; the answer is
+        generated with the async OpenAI client.
+
+        Args:
+            question: User's MTG question
+            limits: Search limits for each collection
+            min_score: Minimum similarity score for results
+            temperature: OpenAI temperature
+            include_debug: Whether to include debug information
+
+        Returns:
+            Dictionary containing answer and metadata
+        """
+        logger.info(f"Processing question: '{question}'")
+
+        search_results = await asyncio.to_thread(
+            self.search_all_collections, question, limits, min_score
+        )
+        context = self.format_context_for_llm(search_results)
+        answer = await self.generate_answer_async(question, context, temperature)
+
+        return self._build_result(
+            question, answer, search_results, context,
+            limits, min_score, temperature, include_debug
+        )
+
+    def _build_result(
+        self,
+        question: str,
+        answer: str,
+        search_results: Dict[str, List[Any]],
+        context: str,
+        limits: Dict[str, int],
+        min_score: float,
+        temperature: float,
+        include_debug: bool
+    ) -> Dict[str, Any]:
+        """Assemble the response dictionary for an answered question"""
         result = {
             "question": question,
             "answer": answer,
@@ -333,34 +500,50 @@ Please provide a comprehensive answer using the official information provided ab
         Returns:
             List of answer dictionaries
         """
-        results = []
-        
-        for i, question in enumerate(questions, 1):
-            logger.info(f"Processing question {i}/{len(questions)}")
-            try:
-                result = self.answer_question(question, **kwargs)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Error processing question {i}: {e}")
-                results.append({
+        # Deduplicate on the normalized question text so repeated
+        # questions (common in automated evaluations) are answered once
+        # and the result is scattered back to every input position
+        norm_questions = [re.sub(r"\s+", " ", q.strip().lower()) for q in questions]
+        unique = {}
+        for norm, question in zip(norm_questions, questions):
+            unique.setdefault(norm, question)
+
+        async def _run() -> List[Any]:
+            # Questions are independent and both downstreams are
+            # network-bound, so run them concurrently; the semaphore keeps
+            # us inside OpenAI rate limits
+            semaphore = asyncio.Semaphore(8)
+
+            async def _one(question: str) -> Dict[str, Any]:
+                async with semaphore:
+                    return await self.answer_question_async(question, **kwargs)
+
+            return await asyncio.gather(
+                *(_one(question) for question in unique.values()),
+                return_exceptions=True
+            )
+
+        results_by_norm = {}
+
+        for i, (norm, question, result) in enumerate(
+            zip(unique, unique.values(), asyncio.run(_run())), 1
+        ):
+            if isinstance(result, Exception):
+                logger.error(f"Error processing question {i}: {result}")
+                result = {
                     "question": question,
-                    "answer": f"Error processing question: {str(e)}",
+                    "answer": f"Error processing question: {str(result)}",
                     "error": True
-                })
-        
-        return results
+                }
+            results_by_norm[norm] = result
+
+        return [results_by_norm[norm] for norm in norm_questions]
 
 
 # Example usage and testing
 def main():
-
-# Replace with your actual Weaviate Cloud URL and API key
-    client = weaviate.connect_to_weaviate_cloud(
-        cluster_url="xhttsi9br7swv5ue58ctq.c0.us-east1.gcp.weaviate.cloud",
-        auth_credentials=weaviate.auth.AuthApiKey(api_key="TENRZEc5ckFOazMvMTEwVF8yc2JDdXE1UkM5aDZVd1lOR0ZyMW5IWE85NTVMY3NJS00vbGlrb0lqQzFNPV92MjAw")
-    )
     """Example usage of the MTG RAG Pipeline"""
-    
+
     # Initialize Weaviate client (adjust URL as needed)
     client = weaviate.connect_to_local()  # or your Weaviate instance
     
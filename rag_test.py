@@ -8,11 +8,6 @@ from weaviate.classes.config import Configure, Property, DataType
 
 
 
-client = weaviate.connect_to_weaviate_cloud(
-    cluster_url=os.environ.get("WEAVIATE_URL"),
-    auth_credentials=os.environ["WEAVIATE_API"],
-)
-
 client = weaviate.connect_to_weaviate_cloud(
     cluster_url=os.environ.get("WEAVIATE_URL"),
     auth_credentials=os.environ["WEAVIATE_API"],